@@ -1,23 +1,61 @@
 import sqlite3
 import datetime
-from enum import Enum
-from typing import List, Optional, Union, Dict
+import functools
+import threading
+import weakref
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, List, Optional, Tuple, Union, Dict
 
 # ====================== ENUMERACIONES ======================
-class Priority(Enum):
+# IntEnum: los miembros se comparan como enteros (mismo valor que la columna INTEGER)
+class Priority(IntEnum):
     BAJA = 1
     MEDIA = 2
     ALTA = 3
 
-class TaskStatus(Enum):
+class TaskStatus(IntEnum):
     PENDIENTE = 1
     COMPLETADA = 2
 
+# ====================== UTILIDADES ======================
+_TWO_YEARS = datetime.timedelta(days=365*2)
+
+# Búsqueda de prioridad sin str.upper() ni Enum.__getitem__ en el caso habitual
+_PRIORITY_LUT: Dict[str, Priority] = {
+    name: p for p in Priority for name in (p.name, p.name.lower(), p.name.title())
+}
+
+# Referencias precalculadas para decodificar filas en Task.from_row
+_FROMTS = datetime.datetime.fromtimestamp
+_PRIO_BY_VALUE: Dict[int, Priority] = {p.value: p for p in Priority}
+_STATUS_BY_VALUE: Dict[int, TaskStatus] = {s.value: s for s in TaskStatus}
+
+def _lookup_priority(s: str) -> Optional[Priority]:
+    prio = _PRIORITY_LUT.get(s)
+    if prio is None:
+        prio = _PRIORITY_LUT.get(s.upper())
+    return prio
+
+@functools.lru_cache(maxsize=1024)
+def _parse_due(s: str) -> datetime.datetime:
+    # Equivalente a strptime(s, "%Y-%m-%d %H:%M") sin pasar por _strptime.
+    # Los reintentos con la misma fecha salen de la caché; los errores no se cachean.
+    if (len(s) != 16 or s[4] != "-" or s[7] != "-" or s[10] != " " or s[13] != ":"
+            or not (s[0:4] + s[5:7] + s[8:10] + s[11:13] + s[14:16]).isdigit()):
+        raise ValueError(f"Formato de fecha inválido: {s!r}")
+    return datetime.datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                             int(s[11:13]), int(s[14:16]))
+
 # ====================== MODELO DE DATOS ======================
 class Task:
+    __slots__ = ("id", "title", "description", "due_date", "priority", "status", "created_at",
+                 "due_epoch")
+
     def __init__(self, id: int, title: str, description: str,
                  due_date: datetime.datetime, priority: Priority,
-                 status: TaskStatus, created_at: datetime.datetime):
+                 status: TaskStatus, created_at: datetime.datetime,
+                 due_epoch: Optional[float] = None):
         self.id = id
         self.title = title
         self.description = description
@@ -25,6 +63,8 @@ class Task:
         self.priority = priority
         self.status = status
         self.created_at = created_at
+        # Vencimiento en segundos epoch: comparar floats es más barato que datetimes
+        self.due_epoch = due_date.timestamp() if due_epoch is None else due_epoch
 
     @classmethod
     def from_row(cls, row: sqlite3.Row) -> 'Task':
@@ -32,44 +72,191 @@ class Task:
             id=row["id"],
             title=row["title"],
             description=row["description"],
-            due_date=datetime.datetime.fromisoformat(row["due_date"]),
-            priority=Priority[row["priority"]],
-            status=TaskStatus[row["status"]],
-            created_at=datetime.datetime.fromisoformat(row["created_at"])
+            due_date=_FROMTS(row["due_date"]),
+            priority=_PRIO_BY_VALUE[row["priority"]],
+            status=_STATUS_BY_VALUE[row["status"]],
+            created_at=_FROMTS(row["created_at"]),
+            due_epoch=row["due_date"]
         )
 
 # ====================== GESTOR CON SQLITE ======================
+class _Connection(sqlite3.Connection):
+    # sqlite3.Connection no admite weakref; la subclase sí
+    pass
+
+def _close_all(conns: "weakref.WeakSet[_Connection]"):
+    for conn in list(conns):
+        conn.close()
+
 class TaskManager:
     DB_FILE = "tasks.db"
     MAX_TITLE_LENGTH = 50
+    SORT_COLUMNS = {"id", "title", "description", "due_date", "priority", "status", "created_at"}
+    LIST_CACHE_SIZE = 32
+    # WAL + synchronous=NORMAL: sin fsync por commit y los lectores no bloquean al escritor
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-8000",
+        "PRAGMA mmap_size=268435456",
+    )
 
     def __init__(self):
-        self._conn = sqlite3.connect(self.DB_FILE, detect_types=sqlite3.PARSE_DECLTYPES)
-        self._conn = sqlite3.connect(
+        # Una conexión por hilo: con WAL las lecturas de distintos hilos no se bloquean
+        self._local = threading.local()
+        self._conns = weakref.WeakSet()
+        # Cierre determinista sin __del__: se ejecuta con close(), al salir del
+        # bloque with, cuando el gestor se recolecta o al terminar el intérprete
+        self._finalizer = weakref.finalize(self, _close_all, self._conns)
+        # Listados ya ordenados, válidos mientras no cambie la versión de los datos
+        self._list_cache: Dict[tuple, List[Task]] = {}
+        self._ensure_table()
+
+    def __enter__(self) -> 'TaskManager':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._finalizer()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._get_conn()
+        return conn
+
+    def _get_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
             self.DB_FILE,
             detect_types=sqlite3.PARSE_DECLTYPES,
-            check_same_thread=False
+            check_same_thread=False,
+            factory=_Connection
         )
-        self._conn.row_factory = sqlite3.Row
-        self._ensure_table()
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        self._local.conn = conn
+        self._local.in_transaction = False
+        self._conns.add(conn)
+        return conn
 
-    def _ensure_table(self):
-        SQL = """
+    # Enumeraciones como INTEGER (valor) y fechas como REAL (timestamp UNIX)
+    CREATE_TABLE_SQL = """
         CREATE TABLE IF NOT EXISTS tasks (
             id          INTEGER PRIMARY KEY AUTOINCREMENT,
             title       TEXT NOT NULL,
             description TEXT,
-            due_date    TEXT NOT NULL,
-            priority    TEXT NOT NULL,
-            status      TEXT NOT NULL,
-            created_at  TEXT NOT NULL
+            due_date    REAL NOT NULL,
+            priority    INTEGER NOT NULL,
+            status      INTEGER NOT NULL,
+            created_at  REAL NOT NULL
+        );
+    """
+
+    def _ensure_table(self):
+        columns = {r["name"]: r["type"] for r in self._conn.execute("PRAGMA table_info(tasks)")}
+        if columns.get("priority") == "TEXT":
+            self._migrate_text_schema()
+        SQL = self.CREATE_TABLE_SQL + """
+        -- Índices secundarios: filtrar/ordenar por estado o prioridad sin recorrer la tabla
+        CREATE INDEX IF NOT EXISTS ix_tasks_status   ON tasks(status);
+        CREATE INDEX IF NOT EXISTS ix_tasks_priority ON tasks(priority);
+        CREATE INDEX IF NOT EXISTS ix_tasks_due_date ON tasks(due_date);
+        -- Contador de modificaciones: lo mantienen los triggers, así es común a
+        -- todos los procesos y conexiones que usan la misma base
+        CREATE TABLE IF NOT EXISTS task_meta (
+            id      INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
         );
+        INSERT OR IGNORE INTO task_meta (id, version) VALUES (1, 0);
+        CREATE TRIGGER IF NOT EXISTS tr_tasks_insert AFTER INSERT ON tasks
+        BEGIN UPDATE task_meta SET version = version + 1; END;
+        CREATE TRIGGER IF NOT EXISTS tr_tasks_update AFTER UPDATE ON tasks
+        BEGIN UPDATE task_meta SET version = version + 1; END;
+        CREATE TRIGGER IF NOT EXISTS tr_tasks_delete AFTER DELETE ON tasks
+        BEGIN UPDATE task_meta SET version = version + 1; END;
         """
-        self._conn.execute(SQL)
+        self._conn.executescript(SQL)
+        # Duplicados (título + descripción, sin distinguir mayúsculas) vetados por índice único.
+        # Si la base heredada ya contiene duplicados el índice no se puede crear y
+        # add_task vuelve a la comprobación previa con SELECT.
+        try:
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_tasks_ci ON tasks(LOWER(title), LOWER(description))"
+            )
+            self._unique_index = True
+        except sqlite3.IntegrityError:
+            self._unique_index = False
         self._conn.commit()
 
+    def _migrate_text_schema(self):
+        # Bases antiguas: fechas ISO y nombres de enumeración guardados como TEXT
+        legacy_indexes = [r["name"] for r in self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks' AND sql IS NOT NULL"
+        )]
+        self._conn.execute("BEGIN")
+        with self._conn:
+            for name in legacy_indexes:
+                self._conn.execute(f'DROP INDEX "{name}"')
+            self._conn.execute("ALTER TABLE tasks RENAME TO tasks_legacy")
+            self._conn.execute(self.CREATE_TABLE_SQL)
+            self._conn.executemany(
+                """INSERT INTO tasks
+                (id, title, description, due_date, priority, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [(r["id"], r["title"], r["description"],
+                  datetime.datetime.fromisoformat(r["due_date"]).timestamp(),
+                  Priority[r["priority"]].value, TaskStatus[r["status"]].value,
+                  datetime.datetime.fromisoformat(r["created_at"]).timestamp())
+                 for r in self._conn.execute("SELECT * FROM tasks_legacy")]
+            )
+            # Conservar el contador AUTOINCREMENT para no reutilizar IDs borrados
+            seq = self._conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'tasks_legacy'"
+            ).fetchone()
+            if seq:
+                self._conn.execute("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+                self._conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', ?)", (seq["seq"],))
+            self._conn.execute("DROP TABLE tasks_legacy")
+
+    def _commit(self):
+        # Dentro de transaction() el commit se difiere hasta el final del bloque
+        if not self._local.in_transaction:
+            self._conn.commit()
+
+    def _rollback(self):
+        # Deshace la escritura fallida y libera el bloqueo; dentro de transaction()
+        # decide el bloque
+        if not self._local.in_transaction:
+            self._conn.rollback()
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa varias operaciones en una única transacción (un solo commit)."""
+        conn = self._conn
+        if self._local.in_transaction:
+            yield self
+            return
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        self._local.in_transaction = True
+        try:
+            yield self
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.in_transaction = False
+
     def add_task(self, title: str, description: str,
              due_date_str: str, priority_str: str) -> Union[str, Task]:
+        now = datetime.datetime.now()  # Fecha y hora actual exacta
         # Validaciones básicas
         title = title.strip()
         if not title:
@@ -77,43 +264,46 @@ class TaskManager:
         if len(title) > self.MAX_TITLE_LENGTH:
             return f"Error: El título no puede exceder {self.MAX_TITLE_LENGTH} caracteres."
 
-        # Verificación de duplicados (solo para nuevas tareas)
-        existing_task = self._conn.execute(
-            "SELECT id FROM tasks WHERE LOWER(title) = LOWER(?) AND LOWER(description) = LOWER(?)",
-            (title, description)
-        ).fetchone()
-        
-        if existing_task:
-            return "ERR0R: Ya existe una tarea similar"
+        # Verificación de duplicados (solo si no hay índice único que lo haga en el INSERT)
+        if not self._unique_index:
+            existing_task = self._conn.execute(
+                "SELECT id FROM tasks WHERE LOWER(title) = LOWER(?) AND LOWER(description) = LOWER(?)",
+                (title, description)
+            ).fetchone()
+            if existing_task:
+                return "ERR0R: Ya existe una tarea similar"
         try:
-            due_date = datetime.datetime.strptime(due_date_str, "%Y-%m-%d %H:%M")
-            priority = Priority[priority_str.upper()]
-            
+            due_date = _parse_due(due_date_str)
+            priority = _lookup_priority(priority_str)
+            if priority is None:
+                return "Error: Prioridad inválida (Use BAJA, MEDIA o ALTA)"
+
             # Validación de fecha: comparar con la hora actual real
-            now = datetime.datetime.now()  # Fecha y hora actual exacta
             if due_date < now:
                 return "Error: La fecha no puede ser en el pasado."+str(now)
-            if due_date > now + datetime.timedelta(days=365*2):
+            if due_date > now + _TWO_YEARS:
                 return "Error: La fecha no puede ser mayor a 2 años."
 
         except ValueError:
             return "Error: Formato de fecha inválido (Use YYYY-MM-DD HH:MM)"
-        except KeyError:
-            return "Error: Prioridad inválida (Use BAJA, MEDIA o ALTA)"
 
         # Insertar nueva tarea
         try:
-            cur = self._conn.execute(
+            row = self._conn.execute(
                 """INSERT INTO tasks 
                 (title, description, due_date, priority, status, created_at) 
-                VALUES (?, ?, ?, ?, ?, ?)""",
-                (title, description, due_date.isoformat(), 
-                priority.name, TaskStatus.PENDIENTE.name,
-                datetime.datetime.now().isoformat())
-            )
-            self._conn.commit()
-            return self.get_task(cur.lastrowid)
+                VALUES (?, ?, ?, ?, ?, ?) RETURNING *""",
+                (title, description, due_date.timestamp(),
+                priority.value, TaskStatus.PENDIENTE.value,
+                now.timestamp())
+            ).fetchone()
+            self._commit()
+            return Task.from_row(row)
+        except sqlite3.IntegrityError:
+            self._rollback()
+            return "ERR0R: Ya existe una tarea similar"
         except sqlite3.Error as e:
+            self._rollback()
             return f"Error en la base de datos: {str(e)}"
 
 
@@ -126,15 +316,13 @@ class TaskManager:
     def update_task(self, task_id: int, title: str = None,
                     description: str = None, due_date_str: str = None,
                     priority_str: str = None) -> Union[str, Task]:
-        task = self.get_task(task_id)
+        now = datetime.datetime.now()
         # recortamos espacios y validamos
         title = title.strip()
         if not title:
             return "Error: El título no puede estar vacío ni contener sólo espacios."
         if len(title) > self.MAX_TITLE_LENGTH:
             return f"Error: El título debe tener como máximo {self.MAX_TITLE_LENGTH} caracteres."
-        if not task:
-            return f"Error: No se encontró una tarea con ID {task_id}"
         # Verificar si el título ya existe en otra tarea
         cur = self._conn.execute(
             "SELECT 1 FROM tasks WHERE title = ? AND id != ?", (title, task_id)
@@ -150,56 +338,126 @@ class TaskManager:
             updates.append("description = ?"); params.append(description)
         if due_date_str is not None:
             try:
-                new_due = datetime.datetime.strptime(due_date_str, "%Y-%m-%d %H:%M")
-                now = datetime.datetime.now()
-                max_due = now + datetime.timedelta(days=365*2)
+                new_due = _parse_due(due_date_str)
                 if new_due < now:
                     return "Error: La fecha de vencimiento no puede ser anterior a hoy."
-                if new_due > max_due:
+                if new_due > now + _TWO_YEARS:
                     return "Error: La fecha de vencimiento no puede superar los 2 años a partir de hoy."
-                updates.append("due_date = ?"); params.append(new_due.isoformat())
+                updates.append("due_date = ?"); params.append(new_due.timestamp())
             except ValueError:
                 return "Error: Formato de fecha incorrecto. Use YYYY-MM-DD HH:MM"
         if priority_str is not None:
-            try:
-                Priority[priority_str.upper()]
-                updates.append("priority = ?"); params.append(priority_str.upper())
-            except KeyError:
+            priority = _lookup_priority(priority_str)
+            if priority is None:
                 return "Error: Prioridad inválida. Use BAJA, MEDIA o ALTA."
+            updates.append("priority = ?"); params.append(priority.value)
         if not updates:
-            return task  
+            task = self.get_task(task_id)
+            return task if task else f"Error: No se encontró una tarea con ID {task_id}"
         params.append(task_id)
-        sql = f"UPDATE tasks SET {', '.join(updates)} WHERE id = ?"
-        self._conn.execute(sql, params)
-        self._conn.commit()
-        return self.get_task(task_id)
+        # Un solo viaje: la existencia de la tarea se deduce de la fila devuelta
+        sql = f"UPDATE tasks SET {', '.join(updates)} WHERE id = ? RETURNING *"
+        try:
+            row = self._conn.execute(sql, params).fetchone()
+        except sqlite3.IntegrityError:
+            self._rollback()
+            return "Error: Ya existe una tarea similar."
+        self._commit()
+        if row is None:
+            return f"Error: No se encontró una tarea con ID {task_id}"
+        return Task.from_row(row)
 
     def toggle_task_status(self, task_id: int) -> Union[str, Task]:
-        task = self.get_task(task_id)
-        if not task:
+        row = self._conn.execute(
+            """UPDATE tasks
+            SET status = CASE status WHEN ? THEN ? ELSE ? END
+            WHERE id = ? RETURNING *""",
+            (TaskStatus.PENDIENTE.value, TaskStatus.COMPLETADA.value,
+             TaskStatus.PENDIENTE.value, task_id)
+        ).fetchone()
+        self._commit()
+        if row is None:
             return f"Error: No se encontró la tarea con ID {task_id}"
-
-        new_status = TaskStatus.COMPLETADA.name if task.status == TaskStatus.PENDIENTE else TaskStatus.PENDIENTE.name
-        self._conn.execute("UPDATE tasks SET status = ? WHERE id = ?", (new_status, task_id))
-        self._conn.commit()
-        return self.get_task(task_id)
+        return Task.from_row(row)
 
     def delete_task(self, task_id: int) -> Union[str, bool]:
-        if not self.get_task(task_id):
+        cur = self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        self._commit()
+        if cur.rowcount == 0:
             return f"Error: No se encontró una tarea con ID {task_id}"
-        self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        self._conn.commit()
         return True
 
-    def get_all_tasks(self, order_by: str = "due_date", direction: str = "asc") -> List[Task]:
-            valid_columns = {"id", "title", "description", "due_date", "priority", "status", "created_at"}
-            if order_by not in valid_columns:
-                order_by = "due_date"
-            if direction.lower() not in {"asc", "desc"}:
-                direction = "asc"
-            sql = f"SELECT * FROM tasks ORDER BY {order_by} {direction.upper()}"
-            cur = self._conn.execute(sql)
-            return [Task.from_row(row) for row in cur.fetchall()]
-
-    def __del__(self):
-        self._conn.close()
+    @property
+    def version(self) -> int:
+        """Número que cambia con cada modificación confirmada de las tareas."""
+        return self._conn.execute("SELECT version FROM task_meta").fetchone()[0]
+
+    def get_all_tasks(self, order_by: str = "due_date", direction: str = "asc",
+                      limit: Optional[int] = None,
+                      after: Optional[Tuple[Any, int]] = None) -> List[Task]:
+            # Con una transacción abierta en este hilo se leerían datos sin confirmar: no se cachea
+            if self._conn.in_transaction:
+                return self.filter_tasks(order_by=order_by, direction=direction,
+                                         limit=limit, after=after)
+            # La versión se lee antes de consultar: un commit concurrente deja la entrada obsoleta
+            key = (self.version, order_by, direction, limit, after)
+            tasks = self._list_cache.get(key)
+            if tasks is None:
+                tasks = self.filter_tasks(order_by=order_by, direction=direction,
+                                          limit=limit, after=after)
+                if len(self._list_cache) >= self.LIST_CACHE_SIZE:
+                    self._list_cache.clear()
+                self._list_cache[key] = tasks
+            return list(tasks)
+
+    @classmethod
+    def sort_key(cls, task: Task, order_by: str = "due_date") -> Tuple[Any, int]:
+        """Clave (valor almacenado, id) de una tarea; sirve de cursor para `after`."""
+        if order_by not in cls.SORT_COLUMNS:
+            order_by = "due_date"
+        value = getattr(task, order_by)
+        if isinstance(value, datetime.datetime):
+            value = value.timestamp()
+        elif isinstance(value, (Priority, TaskStatus)):
+            value = value.value
+        return value, task.id
+
+    def filter_tasks(self, status: Optional[TaskStatus] = None,
+                     priority: Optional[Priority] = None, search: Optional[str] = None,
+                     due_from: Optional[datetime.datetime] = None,
+                     due_to: Optional[datetime.datetime] = None,
+                     order_by: str = "due_date", direction: str = "asc",
+                     limit: Optional[int] = None,
+                     after: Optional[Tuple[Any, int]] = None) -> List[Task]:
+        # El filtrado y la ordenación se resuelven en SQLite; sólo cruzan a Python las filas que coinciden
+        if order_by not in self.SORT_COLUMNS:
+            order_by = "due_date"
+        if direction.lower() not in {"asc", "desc"}:
+            direction = "asc"
+        where, params = [], []
+        if status is not None:
+            where.append("status = ?"); params.append(status.value)
+        if priority is not None:
+            where.append("priority = ?"); params.append(priority.value)
+        if due_from is not None:
+            where.append("due_date >= ?"); params.append(due_from.timestamp())
+        if due_to is not None:
+            where.append("due_date <= ?"); params.append(due_to.timestamp())
+        if after is not None:
+            # Paginación por cursor: búsqueda en el índice en lugar de saltar filas con OFFSET
+            op = ">" if direction.lower() == "asc" else "<"
+            where.append(f"({order_by}, id) {op} (?, ?)"); params += list(after)
+        if search:
+            term = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("(title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')")
+            params += [f"%{term}%", f"%{term}%"]
+        sql = "SELECT * FROM tasks"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # id como desempate: el orden es total y las páginas no se solapan
+        sql += f" ORDER BY {order_by} {direction.upper()}, id {direction.upper()}"
+        if limit is not None:
+            sql += " LIMIT ?"; params.append(limit)
+        cur = self._conn.execute(sql, params)
+        return [Task.from_row(row) for row in cur.fetchall()]
+
@@ -1,66 +1,123 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from flask import Flask, render_template_string, request, redirect, url_for
+from flask import (Flask, flash, get_flashed_messages, make_response, render_template,
+                   request, redirect, send_from_directory, session, stream_template, url_for)
+from markupsafe import escape
+from werkzeug.middleware.profiler import ProfilerMiddleware
 from Gestor_tareas import TaskManager, Task, TaskStatus, Priority
-import datetime
+import base64
+import hashlib
+import json
+import os
+import time
+
+try:
+    from flask_compress import Compress
+except ImportError:  # flask-compress (y brotli) son opcionales
+    Compress = None
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'  # Necesario para sesiones Flask
+app.debug = False
+# Los estáticos se cachean un año; el parámetro v= de la URL cambia al editar el CSS
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
+# Compresión br/gzip de HTML y CSS si flask-compress está instalado
+app.config['COMPRESS_MIN_SIZE'] = 500
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+# La página principal se envía en streaming; por defecto ahí no se usaría gzip
+app.config['COMPRESS_ALGORITHM_STREAMING'] = ['br', 'gzip']
+app.config['COMPRESS_LEVEL'] = 5
+if Compress is not None:
+    Compress(app)
+# WSGI_PROFILING=1 guarda un .prof por petición (ver con snakeviz profiler_results/...)
+if os.environ.get('WSGI_PROFILING'):
+    os.makedirs('profiler_results', exist_ok=True)
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app, profile_dir='profiler_results', restrictions=[30])
+app.jinja_env.globals['css_version'] = int(os.path.getmtime(os.path.join(app.static_folder, 'app.css')))
 
 # Inicializar el gestor de tareas
 task_manager = TaskManager()
+PAGE_SIZE = 50
+
+SORT_FIELDS = ('title', 'description', 'due_date', 'priority', 'status')
+
+def _id_url_prefix(endpoint):
+    # '/edit/0' -> '/edit/': un solo recorrido del mapa de URLs por petición
+    return url_for(endpoint, task_id=0)[:-1]
+
+def _sort_urls(order_by, direction):
+    urls = {}
+    for field in SORT_FIELDS:
+        active = order_by == field
+        urls[field] = (
+            url_for('index', order_by=field, direction='desc' if active and direction == 'asc' else 'asc'),
+            (' ▲' if direction == 'asc' else ' ▼') if active else '',
+        )
+    return urls
+
+def _task_rows(tasks, now_epoch):
+    # Todo lo que la fila necesita se calcula aquí; la plantilla sólo lo imprime
+    edit_url = _id_url_prefix('edit_task')
+    toggle_url = _id_url_prefix('toggle_task_status')
+    delete_url = _id_url_prefix('delete_task')
+    rows = []
+    for t in tasks:
+        completed = t.status is TaskStatus.COMPLETADA
+        rows.append({
+            'id': t.id,
+            'title': t.title,
+            # escape() devuelve Markup: el autoescape de Jinja no vuelve a recorrerlo
+            'desc': escape(t.description[:50] + ('...' if len(t.description) > 50 else '')),
+            'due': t.due_date.strftime('%Y-%m-%d %H:%M'),
+            'priority_low': t.priority.name.lower(),
+            'priority_name': t.priority.name,
+            'status_name': t.status.name,
+            'completed': completed,
+            'overdue': t.due_epoch < now_epoch and not completed,
+            'edit_url': f"{edit_url}{t.id}",
+            'toggle_url': f"{toggle_url}{t.id}",
+            'delete_url': f"{delete_url}{t.id}",
+        })
+    return rows
+
+def _encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+_SQLITE_INT_MAX = 2**63 - 1
+
+def _sqlite_scalar(value) -> bool:
+    # Sólo tipos que SQLite sabe enlazar como parámetro (bool es subclase de int)
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return False
+    return not isinstance(value, int) or -_SQLITE_INT_MAX - 1 <= value <= _SQLITE_INT_MAX
+
+def _decode_cursor(cursor):
+    # Un cursor ilegible equivale a empezar por la primera página
+    try:
+        value, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not (_sqlite_scalar(value) and isinstance(task_id, int) and _sqlite_scalar(task_id)):
+        return None
+    return value, task_id
 
-# HTML Template mejorado con clase .overdue para subrayado rojo
+# HTML Template (estilos en static/app.css, clase .overdue para subrayado rojo)
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
     <title>Gestor de Tareas</title>
-    <style>
-        body { font-family: Arial, sans-serif; max-width: 1000px; margin: 0 auto; padding: 20px; }
-        h1 { color: #333; text-align: center; }
-        table { width: 100%; border-collapse: collapse; margin: 20px 0; box-shadow: 0 0 10px rgba(0,0,0,0.1); }
-        th, td { padding: 12px 15px; text-align: left; border-bottom: 1px solid #ddd; }
-        th { background-color: #4CAF50; color: white; }
-        tr:hover { background-color: #f5f5f5; }
-        .priority-high { color: #e74c3c; font-weight: bold; }
-        .priority-medium { color: #f39c12; }
-        .priority-low { color: #2ecc71; }
-        .completed { text-decoration: line-through; color: #95a5a6; }
-        .overdue {
-            text-decoration: underline;
-            text-decoration-color: red;
-            text-decoration-thickness: 2px;
-        }
-        .actions a { margin-right: 10px; color: #3498db; text-decoration: none; }
-        .actions a:hover { text-decoration: underline; }
-        form { background: #f9f9f9; padding: 20px; border-radius: 5px; margin-bottom: 20px; }
-        .form-group { margin-bottom: 15px; }
-        label { display: block; margin-bottom: 5px; font-weight: bold; }
-        input[type="text"], textarea, select { 
-            width: 100%; padding: 8px; border: 1px solid #ddd; border-radius: 4px; 
-            box-sizing: border-box; margin-bottom: 10px; 
-        }
-        textarea { 
-            height: 100px; 
-            min-height: 100px;
-            resize: none;
-            overflow: auto;
-        }
-        button { 
-            background-color: #4CAF50; color: white; padding: 10px 15px; 
-            border: none; border-radius: 4px; cursor: pointer; 
-        }
-        button:hover { background-color: #45a049; }
-        .error { color: #e74c3c; margin: 10px 0; }
-        .success { color: #2ecc71; margin: 10px 0; }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('static', filename='app.css', v=css_version) }}">
+    <link rel="icon" href="{{ url_for('favicon') }}">
 </head>
 <body>
     <h1>Gestor de Tareas</h1>
     
     <!-- Mensajes de estado -->
+    {% for category, flashed in get_flashed_messages(with_categories=True) %}
+        <div class="{{ 'success' if category == 'success' else 'error' }}">{{ flashed }}</div>
+    {% endfor %}
     {% if message %}
         <div class="{{ 'success' if message_type == 'success' else 'error' }}">{{ message }}</div>
     {% endif %}
@@ -109,79 +166,89 @@ HTML_TEMPLATE = """
     </form>
 
     <!-- Lista de tareas -->
+    {% macro sort_header(field, label) -%}
+    {% set url, arrow = sort_urls[field] %}
+    <th>
+        <a href="{{ url }}">
+            {{ label }}{{ arrow }}
+        </a>
+    </th>
+    {%- endmacro %}
+    {# La vista de edición sólo muestra el formulario: no consulta ni pinta la lista #}
+    {% if rows is defined %}
     <h2>Tus Tareas</h2>
     <table>
         <thead>
             <tr>
-                <th>
-                    <a href="{{ url_for('index', order_by='title', direction='desc' if order_by == 'title' and direction == 'asc' else 'asc') }}">
-                        Título
-                        {% if order_by == 'title' %}
-                            {% if direction == 'asc' %}▲{% else %}▼{% endif %}
-                        {% endif %}
-                    </a>
-                </th>
-                <th>
-                    <a href="{{ url_for('index', order_by='description', direction='desc' if order_by == 'description' and direction == 'asc' else 'asc') }}">
-                        Descripción
-                        {% if order_by == 'description' %}
-                            {% if direction == 'asc' %}▲{% else %}▼{% endif %}
-                        {% endif %}
-                    </a>
-                </th>
-                <th>
-                    <a href="{{ url_for('index', order_by='due_date', direction='desc' if order_by == 'due_date' and direction == 'asc' else 'asc') }}">
-                        Vencimiento
-                        {% if order_by == 'due_date' %}
-                            {% if direction == 'asc' %}▲{% else %}▼{% endif %}
-                        {% endif %}
-                    </a>
-                </th>
-                <th>
-                    <a href="{{ url_for('index', order_by='priority', direction='desc' if order_by == 'priority' and direction == 'asc' else 'asc') }}">
-                        Prioridad
-                        {% if order_by == 'priority' %}
-                            {% if direction == 'asc' %}▲{% else %}▼{% endif %}
-                        {% endif %}
-                    </a>
-                </th>
-                <th>
-                    <a href="{{ url_for('index', order_by='status', direction='desc' if order_by == 'status' and direction == 'asc' else 'asc') }}">
-                        Estado
-                        {% if order_by == 'status' %}
-                            {% if direction == 'asc' %}▲{% else %}▼{% endif %}
-                        {% endif %}
-                    </a>
-                </th>
+                {{ sort_header('title', 'Título') }}
+                {{ sort_header('description', 'Descripción') }}
+                {{ sort_header('due_date', 'Vencimiento') }}
+                {{ sort_header('priority', 'Prioridad') }}
+                {{ sort_header('status', 'Estado') }}
                 <th>Acciones</th>
             </tr>
         </thead>
         <tbody>
-            {% for task in tasks %}
-            {% set is_overdue = task.due_date < now and task.status.name != 'COMPLETADA' %}
-            <tr class="{{ 'completed' if task.status.name == 'COMPLETADA' else '' }}">
-                <td class="{{ 'overdue' if is_overdue else '' }}">{{ task.title }}</td>
-                <td class="{{ 'overdue' if is_overdue else '' }}">{{ task.description[:50] }}{% if task.description|length > 50 %}...{% endif %}</td>
-                <td class="{{ 'overdue' if is_overdue else '' }}">{{ task.due_date.strftime('%Y-%m-%d %H:%M') }}</td>
-                <td class="priority-{{ task.priority.name.lower() }} {{ 'overdue' if is_overdue else '' }}">{{ task.priority.name }}</td>
-                <td class="{{ 'overdue' if is_overdue else '' }}">{{ task.status.name }}</td>
+            {% for r in rows %}
+            <tr class="{{ 'completed' if r.completed }}{{ ' overdue' if r.overdue }}">
+                <td>{{ r.title }}</td>
+                <td>{{ r.desc }}</td>
+                <td>{{ r.due }}</td>
+                <td class="priority-{{ r.priority_low }}">{{ r.priority_name }}</td>
+                <td>{{ r.status_name }}</td>
                 <td class="actions">
-                    <a href="{{ url_for('edit_task', task_id=task.id) }}">Editar</a>
-                    <a href="{{ url_for('toggle_task_status', task_id=task.id) }}" 
-                    style="color: {{ '#2ecc71' if task.status.name == 'COMPLETADA' else '#e74c3c' }}">
-                        {{ 'Marcar Pendiente' if task.status.name == 'COMPLETADA' else 'Completar' }}
+                    <a href="{{ r.edit_url }}">Editar</a>
+                    <a href="{{ r.toggle_url }}" 
+                    style="color: {{ '#2ecc71' if r.completed else '#e74c3c' }}">
+                        {{ 'Marcar Pendiente' if r.completed else 'Completar' }}
                     </a>
-                    <a href="{{ url_for('delete_task', task_id=task.id) }}" 
+                    <a href="{{ r.delete_url }}" 
                     onclick="return confirm('¿Eliminar esta tarea?')">Eliminar</a>
                 </td>
             </tr>
             {% endfor %}
         </tbody>
     </table>
+
+    <!-- Paginación -->
+    {% if after or next_cursor %}
+    <div class="pagination">
+        {% if after %}
+            <a href="{{ url_for('index', order_by=order_by, direction=direction) }}">&laquo; Inicio</a>
+        {% endif %}
+        {% if next_cursor %}
+            <a href="{{ url_for('index', after=next_cursor, order_by=order_by, direction=direction) }}">Siguiente &raquo;</a>
+        {% endif %}
+    </div>
+    {% endif %}
+    {% endif %}
 </body>
 </html>
 """
 
+# Plantilla compilada una sola vez al importar; cada petición sólo la renderiza
+_TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+
+@app.after_request
+def set_cache_headers(response):
+    # Con o sin compresión, las cachés intermedias deben separar por Accept-Encoding
+    response.vary.add('Accept-Encoding')
+    if request.endpoint == 'static':
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    elif request.endpoint == 'index' and request.method == 'GET':
+        # URL estable (los avisos viajan en la sesión): el navegador puede revalidar
+        # la página, pero no reutilizarla sin preguntar tras una modificación
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response
+
+# Los navegadores piden /favicon.ico en cada página; sin esta ruta era un 404
+@app.route('/favicon.ico')
+def favicon():
+    return send_from_directory(app.static_folder, 'favicon.ico',
+                               mimetype='image/x-icon', max_age=86400)
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     message = ""
@@ -205,24 +272,55 @@ def index():
                 "priority": priority
             }
         else:
-            message = "Tarea agregada correctamente."
-            message_type = "success"
-
-    tasks = task_manager.get_all_tasks()
-    now = datetime.datetime.now()  # Fecha y hora actual exacta
-    return render_template_string(
-        HTML_TEMPLATE,
-        tasks=tasks,
+            flash("Tarea agregada correctamente.", "success")
+            return redirect(url_for("index"), code=303)
+
+    order_by = request.args.get("order_by", "due_date")
+    direction = request.args.get("direction", "asc")
+    after = request.args.get("after")
+    now_epoch = time.time()  # Fecha y hora actual exacta, en segundos epoch
+
+    # ETag a partir del estado de los datos y la vista pedida; el minuto entra porque
+    # decide qué tareas salen vencidas. Con avisos pendientes la página es única.
+    etag = None
+    if request.method == "GET" and "_flashes" not in session:
+        state = (f"{task_manager.version}|{order_by}|{direction}|{after}|"
+                 f"{int(now_epoch // 60)}|{app.jinja_env.globals['css_version']}")
+        etag = hashlib.md5(state.encode()).hexdigest()
+        # flask-compress añade ':br'/':gzip' al ETag de la respuesta comprimida
+        if any(tag.split(":", 1)[0] == etag for tag in request.if_none_match.as_set()):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+    # Se pide una fila de más para saber si existe página siguiente
+    tasks = task_manager.get_all_tasks(order_by, direction, limit=PAGE_SIZE + 1,
+                                       after=_decode_cursor(after) if after else None)
+    next_cursor = None
+    if len(tasks) > PAGE_SIZE:
+        tasks = tasks[:PAGE_SIZE]
+        next_cursor = _encode_cursor(task_manager.sort_key(tasks[-1], order_by))
+    # La página se envía por trozos según se renderiza. Los avisos se sacan de la
+    # sesión ahora: la cookie se escribe antes de que empiece el cuerpo
+    get_flashed_messages(with_categories=True)
+    response = make_response(stream_template(
+        _TEMPLATE,
+        rows=_task_rows(tasks, now_epoch),
+        sort_urls=_sort_urls(order_by, direction),
+        after=after,
+        next_cursor=next_cursor,
         message=message,
         message_type=message_type,
         task=None,
         form_action=url_for("index"),
         form_title="Agregar Nueva Tarea",
         task_data=task_data,
-        order_by=request.args.get("order_by", "due_date"),
-        direction=request.args.get("direction", "asc"),
-        now=now  # <-- pasar para comparación en la plantilla
-    )
+        order_by=order_by,
+        direction=direction
+    ))
+    if etag:
+        response.set_etag(etag)
+    return response
 
 
 @app.route('/edit/<int:task_id>')
@@ -230,23 +328,17 @@ def edit_task(task_id):
     """Muestra el formulario de edición"""
     task = task_manager.get_task(task_id)
     if not task:
-        return redirect(url_for('index', 
-                              message=f"No se encontró la tarea con ID {task_id}", 
-                              message_type="error"))
-    
-    now = datetime.datetime.now()
-    return render_template_string(HTML_TEMPLATE,
-                               tasks=task_manager.get_all_tasks(),
-                               task=task,
-                               form_title="Editar Tarea",
-                               form_action=url_for('update_task'),
-                               message="",
-                               message_type="",
-                               task_data=None,
-                               order_by=request.args.get("order_by", "due_date"),
-                               direction=request.args.get("direction", "asc"),
-                               now=now
-                               )
+        flash(f"No se encontró la tarea con ID {task_id}", "error")
+        return redirect(url_for('index'), code=303)
+
+    return render_template(_TEMPLATE,
+                        task=task,
+                        form_title="Editar Tarea",
+                        form_action=url_for('update_task'),
+                        message="",
+                        message_type="",
+                        task_data=None
+                        )
 
 @app.route('/update', methods=['POST'])
 def update_task():
@@ -268,21 +360,17 @@ def update_task():
             "due_date": due_date,
             "priority": priority
         }
-        now = datetime.datetime.now()
-        return render_template_string(HTML_TEMPLATE,
-                                   tasks=task_manager.get_all_tasks(),
-                                   task=task_manager.get_task(task_id),
-                                   form_title="Editar Tarea",
-                                   form_action=url_for('update_task'),
-                                   message=result,
-                                   message_type="error",
-                                   task_data=task_data,
-                                   order_by=request.args.get("order_by", "due_date"),
-                                   direction=request.args.get("direction", "asc"),
-                                   now=now
-                                   )
+        return render_template(_TEMPLATE,
+                            task=task_manager.get_task(task_id),
+                            form_title="Editar Tarea",
+                            form_action=url_for('update_task'),
+                            message=result,
+                            message_type="error",
+                            task_data=task_data
+                            )
     
-    return redirect(url_for('index', message="Tarea actualizada con éxito", message_type="success"))
+    flash("Tarea actualizada con éxito", "success")
+    return redirect(url_for('index'), code=303)
 
 @app.route('/delete/<int:task_id>')
 def delete_task(task_id):
@@ -290,26 +378,28 @@ def delete_task(task_id):
     result = task_manager.delete_task(task_id)
     
     if result is True:
-        return redirect(url_for('index', 
-                              message="Tarea eliminada con éxito", 
-                              message_type="success"))
+        flash("Tarea eliminada con éxito", "success")
     else:
-        return redirect(url_for('index', 
-                              message=result, 
-                              message_type="error"))
+        flash(result, "error")
+    return redirect(url_for('index'), code=303)
 
 @app.route('/toggle_task_status/<int:task_id>')
 def toggle_task_status(task_id):
     result = task_manager.toggle_task_status(task_id)
     if isinstance(result, Task):
         status = "COMPLETADA" if result.status == TaskStatus.COMPLETADA else "PENDIENTE"
-        return redirect(url_for('index', 
-                             message=f"Estado cambiado a {status}", 
-                             message_type="success"))
+        flash(f"Estado cambiado a {status}", "success")
     else:
-        return redirect(url_for('index', 
-                             message=result, 
-                             message_type="error"))
+        flash(result, "error")
+    return redirect(url_for('index'), code=303)
 
+# En producción:
+#   gunicorn -w $(nproc) -k gthread --threads 4 --keep-alive 5 web_interface:app
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    try:
+        from waitress import serve
+    except ImportError:  # sin waitress: servidor de desarrollo de Werkzeug
+        app.run(port=5000, threaded=True)
+    else:
+        # Servidor WSGI multihilo con conexiones persistentes (keep-alive)
+        serve(app, host='0.0.0.0', port=5000, threads=8, connection_limit=200)